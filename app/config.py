@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from pydantic_settings import BaseSettings
 
 
@@ -6,6 +8,11 @@ class Settings(BaseSettings):
     api_hash: str
     phone: str
     db_url: str = "sqlite:///./test.db"
+    # Connection pool, only used for server databases
+    db_pool_size: int = 20
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 30
+    db_pool_recycle: int = 3600
     # media_download_path: str = "./media"
     media_download_path: str = "/mnt/c/Users/Tau/Documents/media"
     # Sorting typa can be small or large.
@@ -15,4 +22,7 @@ class Settings(BaseSettings):
         env_file = "env"
 
 
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    # Built on first use instead of at import, then shared
+    return Settings()
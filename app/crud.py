@@ -1,5 +1,8 @@
+import logging
+
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, asc, desc, func
+from sqlalchemy.dialects import postgresql, sqlite
 from . import schemas
 from sqlalchemy.sql.expression import case
 from app.models import Media, Channel
@@ -16,28 +19,36 @@ def get_channel_by_id(db: Session, channel_id: str):
 
 def get_subscribed_channels(db: Session):
     channels = db.query(Channel).filter(Channel.subscribed == True)
-    logger.info(f"Qurying subscribed channels, got: {channels.count()} channels")
-    return channels
+    # The count costs an extra round-trip, only pay for it when debugging
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Qurying subscribed channels, got: {channels.count()} channels")
+    return channels.yield_per(200)
 
 
 def get_available_channels(db: Session):
     channels = db.query(Channel).filter(Channel.subscribed == False)
-    logger.info(f"Qurying available channels, got: {channels.count()} channels")
-    return channels
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Qurying available channels, got: {channels.count()} channels")
+    return channels.yield_per(200)
 
 
-def subscribe_to_channel(db: Session, channel_id: str):
-    channel = db.query(Channel).filter(Channel.channel_id == channel_id).first()
-    channel.subscribed = True
+def set_channel_subscription(db: Session, channel_id: str, subscribed: bool):
+    # Plain UPDATE, no need to load the Channel row first
+    updated = (
+        db.query(Channel)
+        .filter(Channel.channel_id == channel_id)
+        .update({Channel.subscribed: subscribed}, synchronize_session=False)
+    )
     db.commit()
-    return channel
+    return updated
+
+
+def subscribe_to_channel(db: Session, channel_id: str):
+    return set_channel_subscription(db, channel_id, True)
 
 
 def unsubscribe_to_channel(db: Session, channel_id: str):
-    channel = db.query(Channel).filter(Channel.channel_id == channel_id).first()
-    channel.subscribed = False
-    db.commit()
-    return channel
+    return set_channel_subscription(db, channel_id, False)
 
 
 def create_or_update_channel(db: Session, channel: schemas.ChannelCreate):
@@ -58,10 +69,46 @@ def create_or_update_channel(db: Session, channel: schemas.ChannelCreate):
         return db_channel
 
 
+def _upsert_insert(db: Session):
+    # ON CONFLICT ... DO UPDATE is dialect specific
+    return {
+        "sqlite": sqlite.insert,
+        "postgresql": postgresql.insert,
+    }.get(db.get_bind().dialect.name)
+
+
+def bulk_upsert_channels(db: Session, channels: list[schemas.ChannelCreate]):
+    if not channels:
+        return
+    insert = _upsert_insert(db)
+    if insert is None:
+        for channel in channels:
+            create_or_update_channel(db, channel)
+        return
+    stmt = insert(Channel).values([channel.dict() for channel in channels])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Channel.channel_id],
+        set_={"channel_name": stmt.excluded.channel_name},
+    )
+    db.execute(stmt)
+    db.commit()
+
+
 def get_all_media(db: Session, channel_id: str):
     return db.query(Media).filter(Media.tg_channel_id == channel_id).all()
 
 
+def get_channel_media_counts(db: Session, channel_id: str):
+    rows = (
+        db.query(Media.is_downloaded, func.count(Media.id))
+        .filter(Media.tg_channel_id == channel_id)
+        .group_by(Media.is_downloaded)
+        .all()
+    )
+    counts = dict(rows)
+    return sum(counts.values()), counts.get(True, 0), counts.get(False, 0)
+
+
 def get_all_not_downloaded_media(db: Session, channel_id: int, order="none"):
     query = db.query(Media).filter(
         and_(Media.tg_channel_id == channel_id, Media.is_downloaded == False)
@@ -111,20 +158,71 @@ def is_media_exists(db: Session, tg_message_id: str):
     return db.query(Media).filter(Media.tg_message_id == tg_message_id).all()
 
 
+def _media_upsert_set(stmt):
+    # Rows that are already downloaded keep their download state and filename
+    already_downloaded = Media.is_downloaded == True
+    return {
+        "media_type": stmt.excluded.media_type,
+        "size": stmt.excluded.size,
+        "is_downloaded": case(
+            (already_downloaded, Media.is_downloaded),
+            else_=stmt.excluded.is_downloaded,
+        ),
+        "filename": case(
+            (already_downloaded, Media.filename),
+            else_=stmt.excluded.filename,
+        ),
+    }
+
+
 def create_media(db: Session, media: schemas.MediaCreate):
-    existing_media = (
-        db.query(Media).filter(Media.tg_message_id == media.tg_message_id).first()
+    insert = _upsert_insert(db)
+    if insert is None:
+        existing_media = (
+            db.query(Media)
+            .filter(
+                and_(
+                    Media.tg_message_id == media.tg_message_id,
+                    Media.tg_channel_id == media.tg_channel_id,
+                )
+            )
+            .first()
+        )
+        if existing_media:
+            # Update existing record
+            for key, value in media.dict().items():
+                if existing_media.is_downloaded and key in ("is_downloaded", "filename"):
+                    continue
+                setattr(existing_media, key, value)
+        else:
+            # Create new record
+            db.add(Media(**media.dict()))
+        db.commit()
+        return
+
+    # Single statement, race free thanks to the (message, channel) unique index
+    stmt = insert(Media).values(**media.dict())
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Media.tg_message_id, Media.tg_channel_id],
+        set_=_media_upsert_set(stmt),
     )
+    db.execute(stmt)
+    db.commit()
 
-    if existing_media:
-        # Update existing record
-        for key, value in media.dict().items():
-            setattr(existing_media, key, value)
-    else:
-        # Create new record
-        existing_media = Media(**media.dict())
-        db.add(existing_media)
 
+def bulk_create_media(db: Session, rows: list[dict]):
+    if not rows:
+        return
+    insert = _upsert_insert(db)
+    if insert is None:
+        for row in rows:
+            create_media(db, schemas.MediaCreate(**row))
+        return
+    # One executemany for the whole batch, same conflict rules as create_media
+    stmt = insert(Media)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Media.tg_message_id, Media.tg_channel_id],
+        set_=_media_upsert_set(stmt),
+    )
+    db.execute(stmt, rows)
     db.commit()
-    db.refresh(existing_media)
-    return existing_media
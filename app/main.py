@@ -6,17 +6,15 @@ from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 
 from .crud import (
-    create_or_update_channel,
+    bulk_upsert_channels,
     get_available_channels,
     get_channel_by_id,
     get_subscribed_channels,
     subscribe_to_channel,
     unsubscribe_to_channel,
-    get_all_media,
-    get_all_downloaded_media,
-    get_all_not_downloaded_media,
+    get_channel_media_counts,
 )
-from .database import SessionLocal, init_db
+from .database import get_db, init_db
 from .routes import channels, media
 from .schemas import ChannelCreate
 from .services.channels_list import get_channels_list
@@ -37,14 +35,6 @@ def on_startup():
     init_db()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 app.include_router(channels.router, prefix="/channels", tags=["channels"])
 app.include_router(media.router, prefix="/media", tags=["media"])
 
@@ -53,8 +43,6 @@ app.include_router(media.router, prefix="/media", tags=["media"])
 async def read_root(request: Request, db: Session = Depends(get_db)):
     sub_channels = get_subscribed_channels(db)
     av_chanels = get_available_channels(db)
-    for chan in av_chanels:
-        print(chan.channel_name)
     return templates.TemplateResponse(
         "index.html",
         {
@@ -70,17 +58,15 @@ async def get_channel_details(
     request: Request, channel_id: str = Query(...), db: Session = Depends(get_db)
 ):
     chan = get_channel_by_id(db, channel_id)
-    all_media = get_all_media(db, channel_id)
-    d_media = get_all_downloaded_media(db, channel_id)
-    nd_media = get_all_not_downloaded_media(db, channel_id)
+    all_media, d_media, nd_media = get_channel_media_counts(db, channel_id)
     return templates.TemplateResponse(
         "channel_details.html",
         {
             "request": request,
             "channel": chan,
-            "all_media": len(all_media),
-            "downloaded_media": d_media.count(),
-            "not_downloaded_media": nd_media.count(),
+            "all_media": all_media,
+            "downloaded_media": d_media,
+            "not_downloaded_media": nd_media,
         },
     )
 
@@ -89,9 +75,13 @@ async def get_channel_details(
 async def update_channel_form(request: Request, db: Session = Depends(get_db)):
     available_channels = await get_channels_list()
 
-    for channel in available_channels:
-        chan = ChannelCreate(channel_id=str(channel.id), channel_name=channel.name)
-        create_or_update_channel(db, chan)
+    bulk_upsert_channels(
+        db,
+        [
+            ChannelCreate(channel_id=str(channel.id), channel_name=channel.name)
+            for channel in available_channels
+        ],
+    )
     return templates.TemplateResponse(
         "index.html", {"request": request, "available_channels": available_channels}
     )
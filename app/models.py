@@ -1,20 +1,24 @@
-from sqlalchemy import Column, Integer, String, Boolean, Float
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, Integer, String, Boolean, Float, Index
 from .database import Base
 
-# Base = declarative_base()
-
 
 class Media(Base):
     __tablename__ = "media"
     id = Column(Integer, primary_key=True, index=True)
     tg_message_id = Column(Integer, index=True)
-    tg_channel_id = Column(Integer, index=True)
+    tg_channel_id = Column(Integer)
     media_type = Column(String, index=True)
     size = Column(Float)
     is_downloaded = Column(Boolean, default=False)
     filename = Column(String, index=True)
 
+    __table_args__ = (
+        # Serves the per-channel downloaded filter and the size ordering
+        Index("ix_media_chan_dl_size", "tg_channel_id", "is_downloaded", "size"),
+        # Message ids are only unique within a channel; also the upsert target
+        Index("uq_media_msg_chan", "tg_message_id", "tg_channel_id", unique=True),
+    )
+
 
 class Channel(Base):
     __tablename__ = "channels"
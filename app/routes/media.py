@@ -1,19 +1,23 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
 
 from .. import crud, schemas
-from ..database import SessionLocal
+from ..database import get_db
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Built once; response_model would redo validation and serialization per request
+MEDIA_LIST_ADAPTER = TypeAdapter(list[schemas.Media])
 
 @router.get("/media/{channel_id}", response_model=list[schemas.Media])
 def read_media(channel_id: str, db: Session = Depends(get_db)):
-    return crud.get_media(db, channel_id)
+    media = MEDIA_LIST_ADAPTER.validate_python(
+        crud.get_all_media(db, channel_id), from_attributes=True
+    )
+    # Returning a Response skips FastAPI's response_model pass, the
+    # annotation is kept for the OpenAPI schema only
+    return Response(
+        content=MEDIA_LIST_ADAPTER.dump_json(media), media_type="application/json"
+    )
 
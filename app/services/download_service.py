@@ -1,7 +1,7 @@
 import os
 from fastapi import BackgroundTasks
 from app.crud import get_media
-from app.config import settings
+from app.config import get_settings
 
 
 def download_content_by_chunks(channel_id: str, max_size: float, db: Session):
@@ -11,7 +11,7 @@ def download_content_by_chunks(channel_id: str, max_size: float, db: Session):
         if downloaded_size + media.size > max_size:
             break
         # Download the media
-        media_path = os.path.join(settings.media_download_path, media.download_link)
+        media_path = os.path.join(get_settings().media_download_path, media.download_link)
         # Mark as downloaded
         media.is_downloaded = True
         db.add(media)
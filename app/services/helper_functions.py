@@ -1,6 +1,12 @@
 import re
 import unicodedata
+from functools import lru_cache
 
+_UNSAFE_CHARS_RE = re.compile(r'[^\w\-]')
+
+
+# Channel names repeat for every file downloaded from a channel
+@lru_cache(maxsize=4096)
 def sanitize_dirname(s):
     # Normalize unicode characters
     s = unicodedata.normalize('NFKD', s)
@@ -12,7 +18,7 @@ def sanitize_dirname(s):
     s = s.replace(' ', '_')
 
     # Remove any characters that aren't alphanumeric, underscore, or hyphen
-    s = re.sub(r'[^\w\-]', '', s)
+    s = _UNSAFE_CHARS_RE.sub('', s)
 
     # Remove leading/trailing hyphens and underscores
     s = s.strip('-_')
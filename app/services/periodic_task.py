@@ -1,9 +1,12 @@
+import asyncio
+import itertools
 import os
 
 from app import schemas
-from app.config import settings
+from app.config import get_settings
 from app.services.helper_functions import sanitize_dirname
 from app.crud import (
+    bulk_create_media,
     create_media,
     get_subscribed_channels,
     get_channel_by_id,
@@ -13,79 +16,143 @@ from app.database import SessionLocal
 from app.telegram_client import client, download_media_from_message, fetch_channel_media
 from app.logging_conf import logger
 
+# Media rows written per INSERT when ingesting channel history
+MEDIA_BATCH_SIZE = 1000
+# Downloaded files marked per commit
+DOWNLOAD_COMMIT_EVERY = 25
+# Rows written per flush while polling subscribed channels for new media
+NEW_MEDIA_BATCH_SIZE = 25
+# Telegram downloads running at once for a channel
+DOWNLOAD_CONCURRENCY = 4
+
 
 async def check_for_new_messages():
     print("Querying messages")
     async with client:
         db = SessionLocal()
-        channels = get_subscribed_channels(db)
-        for channel in channels:
-            async for message in fetch_channel_media(channel.channel_id):
-                media_path = await download_media_from_message(
-                    message, settings.media_download_path
-                )
-                if media_path:
-                    media_size = os.path.getsize(media_path) / (1024 * 1024)
-                    media_type = "img" if "image" in media_path else "video"
-                    new_media = schemas.MediaCreate(
-                        tg_message_id=message.id,
-                        tg_channel_id=channel.id,
-                        media_type=media_type,
-                        download_link=media_path,
-                        size=media_size,
-                        is_downloaded=True,
-                        channel_id=channel.channel_id,
-                        filename=""
+        # Materialized so the batched commits below can't close a live cursor
+        channels = get_subscribed_channels(db).all()
+        rows = []
+        try:
+            for channel in channels:
+                async for message in fetch_channel_media(channel.channel_id):
+                    media_path = await download_media_from_message(
+                        message, get_settings().media_download_path
                     )
-                    print(new_media)
-                    create_media(db=db, media=new_media)
+                    if media_path:
+                        media_size = os.path.getsize(media_path) / (1024 * 1024)
+                        media_type = "img" if "image" in media_path else "video"
+                        # Fields come straight from Telethon, no per-row model needed
+                        rows.append(
+                            {
+                                "tg_message_id": message.id,
+                                # Telegram's id, the same key fetch_messages_form_channel writes
+                                "tg_channel_id": int(channel.channel_id),
+                                "media_type": media_type,
+                                "size": media_size,
+                                "is_downloaded": True,
+                                "filename": "",
+                            }
+                        )
+                        if len(rows) >= NEW_MEDIA_BATCH_SIZE:
+                            _flush_media(db, rows)
+        finally:
+            # Files already on disk must still get their rows
+            _flush_media(db, rows)
 
 
 async def download_media_from_channel(channel_id: int):
-    db = SessionLocal()
+    # Batch commits must not expire the rows still queued for download,
+    # or each one is reloaded with its own SELECT
+    db = SessionLocal(expire_on_commit=False)
+    settings = get_settings()
     sorting_type = settings.sorting_type
     logger.info(f"Using {sorting_type} sorting fror channel media")
     channel = get_channel_by_id(db=db, channel_id=channel_id)
     channel_folder = sanitize_dirname(channel.channel_name)
-    media = get_all_not_downloaded_media(db, channel_id, order=sorting_type)
-    async with client:
-        for i, m in enumerate(media):
-            message = await client.get_messages(int(channel_id), ids=m.tg_message_id)
-            logger.info(
-                f"Downloading media {i} of {media.count()} ID:{m.id}, Size:{round(m.size / (1024 * 1024), 3)}MB"
-            )
-            media_path = await download_media_from_message(
-                message, f"{settings.media_download_path}/{channel_folder}/"
-            )
-            filename = media_path.split("/")[-1]
+    # Materialize once; the total is reused for every progress line
+    media = get_all_not_downloaded_media(db, channel_id, order=sorting_type).all()
+    total = len(media)
+    download_dir = f"{settings.media_download_path}/{channel_folder}/"
+    semaphore = asyncio.Semaphore(DOWNLOAD_CONCURRENCY)
+    started = itertools.count()
+    pending = 0
+
+    async def download_one(m):
+        nonlocal pending
+        try:
+            # Tasks queue on the semaphore in order, so the sorting is kept
+            async with semaphore:
+                i = next(started)
+                message = await client.get_messages(int(channel_id), ids=m.tg_message_id)
+                logger.info(
+                    f"Downloading media {i} of {total} ID:{m.id}, Size:{round(m.size / (1024 * 1024), 3)}MB"
+                )
+                media_path = await download_media_from_message(message, download_dir)
+            filename = os.path.basename(media_path)
             logger.info(f"{media_path} finished. Filename: {filename}")
-            m.is_downloaded = True
-            m.filename = filename
+        except Exception as e:
+            logger.error(f"Unable to download media ID:{m.id}, {e}")
+            return
+        # Session calls never await, so downloads can't interleave in here
+        m.is_downloaded = True
+        m.filename = filename
+        pending += 1
+        if pending >= DOWNLOAD_COMMIT_EVERY:
             db.commit()
-            db.refresh(m)
+            pending = 0
+
+    async with client:
+        try:
+            await asyncio.gather(*(download_one(m) for m in media))
+        finally:
+            # Persist whatever finished, even if the run was interrupted
+            db.commit()
+
+
+def _flush_media(db, rows):
+    if not rows:
+        return
+    try:
+        bulk_create_media(db, rows)
+        logger.info(f"Saved {len(rows)} media records")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Unable to save media batch, retrying row by row, {e}")
+        # One bad row shouldn't cost the rest of the batch
+        for row in rows:
+            try:
+                create_media(db=db, media=schemas.MediaCreate(**row))
+            except Exception as e:
+                db.rollback()
+                logger.critical(f"Unable to save media ID:{row['tg_message_id']}, {e}")
+    rows.clear()
 
 
 async def fetch_messages_form_channel(channel_id: str):
     db = SessionLocal()
+    rows = []
     async with client:
         # Get the channel entity
         tg_channel = await client.get_entity(int(channel_id))
 
         # Fetch messages
-        async for message in client.iter_messages(tg_channel):
-            if not message.media or not message.document:
-                continue
-            try:
-                new_media = schemas.MediaCreate(
-                    tg_channel_id=channel_id,
-                    tg_message_id=message.id,
-                    media_type=message.document.mime_type,
-                    size=message.document.size,
-                    is_downloaded=False,
-                    filename="",
+        try:
+            async for message in client.iter_messages(tg_channel):
+                if not message.media or not message.document:
+                    continue
+                rows.append(
+                    {
+                        "tg_channel_id": int(channel_id),
+                        "tg_message_id": message.id,
+                        "media_type": message.document.mime_type,
+                        "size": message.document.size,
+                        "is_downloaded": False,
+                        "filename": "",
+                    }
                 )
-                # print(new_media)
-                create_media(db=db, media=new_media)
-                logger.info(f'Media record created ID:{new_media.tg_message_id} TYPE:{new_media.media_type}')
-            except BaseException as e:
-                logger.critical(f"Unable to save media, {e}")
+                if len(rows) >= MEDIA_BATCH_SIZE:
+                    _flush_media(db, rows)
+        finally:
+            # Keep what was buffered if Telegram errors out mid-history
+            _flush_media(db, rows)
@@ -1,16 +1,21 @@
 from telethon import TelegramClient
 from telethon.tl.types import MessageMediaPhoto, MessageMediaDocument
 
-from .config import settings
+from .config import get_settings
 
-client = TelegramClient("session_name", settings.api_id, settings.api_hash)
+
+def _create_client(settings):
+    return TelegramClient("session_name", settings.api_id, settings.api_hash)
+
+
+client = _create_client(get_settings())
 
 # Available media types :
 # if isinstance(message.media, (MessageMediaPhoto, MessageMediaDocument)):
 
 
 async def fetch_channels_list():
-    await client.start(phone=settings.phone)
+    await client.start(phone=get_settings().phone)
     channels = await client.get_dialogs()
     return channels
 
@@ -24,8 +29,8 @@ async def download_media_from_message(message, path):
 
 
 async def fetch_channel_media(channel_id):
-    async with client:
-        channel = await client.get_entity(int(channel_id))
-        async for message in client.iter_messages(channel):
-            # async for message in client.iter_messages(channel, filter=lambda m: m.media):
-            yield message
+    # Reuses the caller's connection; run inside `async with client:`
+    channel = await client.get_entity(int(channel_id))
+    async for message in client.iter_messages(channel):
+        # async for message in client.iter_messages(channel, filter=lambda m: m.media):
+        yield message
@@ -1,7 +1,15 @@
+import nudenet
 from nudenet import NudeDetector
 import cv2
+import errno
+import numpy as np
+import onnxruntime
 import os
+import queue
 import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from itertools import islice
 
 allowed_labels = [
     "FEMALE_GENITALIA_COVERED",
@@ -13,15 +21,76 @@ allowed_labels = [
     "MALE_BREAST_EXPOSED",
     "FACE_MALE"
 ]
+# Column of each label in the per-video count vector, doubles as the filter
+label_index = {label: i for i, label in enumerate(allowed_labels)}
 
-def classify_video(video_path, classifier, threshold=0.5, num_frames=100):
-    cap = cv2.VideoCapture(video_path)
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    duration = total_frames / fps
-    classifications = {}
-    print(f"Processing video: {os.path.basename(video_path)}")
-    # Calculate time interval between frames
+video_extensions = ('.mp4', '.avi', '.mov')  # Add more video formats if needed
+
+# TensorRT engines take minutes to build; they are reused from here across runs
+trt_engine_cache_dir = os.path.expanduser('~/.cache/tg-downloader/trt')
+
+# Loading the ONNX model takes seconds, keep one detector per configuration
+_detector_cache = {}
+
+
+def _execution_providers():
+    # Fastest first; onnxruntime falls through to the next one per node.
+    # TensorRT and CUDA are only reported by onnxruntime-gpu (see
+    # requirements.txt), a plain onnxruntime resolves to CPU alone.
+    available = set(onnxruntime.get_available_providers())
+    providers = []
+    if 'TensorrtExecutionProvider' in available:
+        os.makedirs(trt_engine_cache_dir, exist_ok=True)
+        providers.append(('TensorrtExecutionProvider', {
+            'trt_fp16_enable': True,
+            'trt_engine_cache_enable': True,
+            'trt_engine_cache_path': trt_engine_cache_dir,
+        }))
+    if 'CUDAExecutionProvider' in available:
+        providers.append('CUDAExecutionProvider')
+    providers.append('CPUExecutionProvider')
+    return providers
+
+
+class _Detector(NudeDetector):
+    # nudenet 3.4 accepts providers but never hands them to onnxruntime, and
+    # GPU builds of onnxruntime refuse a session created without them
+    def __init__(self, model_path=None, inference_resolution=320):
+        model_path = model_path or os.path.join(os.path.dirname(nudenet.__file__), "320n.onnx")
+        self.onnx_session = onnxruntime.InferenceSession(model_path, providers=_execution_providers())
+        self.input_width = inference_resolution
+        self.input_height = inference_resolution
+        self.input_name = self.onnx_session.get_inputs()[0].name
+
+
+def get_detector(model_path=None, model_resolution=320):
+    key = (model_path or "", model_resolution)
+    detector = _detector_cache.get(key)
+    if detector is None:
+        detector = _Detector(model_path=model_path, inference_resolution=model_resolution)
+        _detector_cache[key] = detector
+    return detector
+
+
+def _open_capture(video_path):
+    # Ask FFmpeg for VA-API/NVDEC/D3D11 decode where available; OpenCV
+    # builds older than 4.5.2 lack the HW acceleration properties.
+    try:
+        cap = cv2.VideoCapture(
+            video_path,
+            cv2.CAP_FFMPEG,
+            [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY],
+        )
+        if cap.isOpened():
+            return cap
+        cap.release()
+    except (AttributeError, TypeError, cv2.error):
+        pass
+    return cv2.VideoCapture(video_path)
+
+
+def _seek_frames(cap, duration, num_frames):
+    # Keyframe-accurate path, for containers where grab() misbehaves
     time_interval = duration / num_frames
     for i in range(num_frames):
         # Set position to next time interval
@@ -29,60 +98,253 @@ def classify_video(video_path, classifier, threshold=0.5, num_frames=100):
         ret, frame = cap.read()
         if not ret:
             break
-        # Save frame as temporary image
-        temp_image_path = 'temp_frame.jpg'
-        cv2.imwrite(temp_image_path, frame)
-        # Classify the frame
-        result = classifier.detect(temp_image_path)
-        # Aggregate classifications
-        for detected_object in result:
-            label = detected_object['class']
-            score = detected_object['score']
-            if score > threshold and label in allowed_labels:
-                classifications[label] = classifications.get(label, 0) + 1
-        # Remove temporary image
-        os.remove(temp_image_path)
-    cap.release()
-    # Calculate percentages
-    for label in classifications:
-        classifications[label] = (classifications[label] / num_frames) * 100
-    return classifications
-
-def matches_rule(classifications, rule):
-    for label, threshold in rule['thresholds'].items():
-        if label not in classifications or classifications[label] < threshold:
-            return False
-    return True
-
-def sort_videos_by_rules(video_directory, output_directory, classifier, rules, num_frames=100):
+        yield frame
+
+
+def _grab_frames(cap, total_frames, num_frames):
+    # Walk the stream once with grab() and only convert the sampled frames;
+    # unlike a seek, this never re-decodes a GOP from the previous keyframe
+    frame_interval = max(total_frames // num_frames, 1)
+    for idx in range(min(total_frames, frame_interval * num_frames)):
+        if not cap.grab():
+            break
+        if idx % frame_interval == 0:
+            ret, frame = cap.retrieve()
+            if not ret:
+                break
+            yield frame
+
+
+def _downscale(frames, model_resolution):
+    # The detector resizes to its inference resolution anyway; shrinking
+    # here keeps the aspect ratio it pads for and cuts pixel traffic.
+    for frame in frames:
+        height, width = frame.shape[:2]
+        scale = model_resolution / max(height, width)
+        if scale < 1:
+            frame = cv2.resize(
+                frame,
+                (max(int(width * scale), 1), max(int(height * scale), 1)),
+                interpolation=cv2.INTER_AREA,
+            )
+        yield frame
+
+
+def _prefetch(frames, maxsize=8):
+    # Decode on a background thread so it overlaps with detector inference
+    frame_queue = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+    errors = []
+
+    def producer():
+        try:
+            for frame in frames:
+                frame_queue.put(frame)
+                if stop.is_set():
+                    break
+        except Exception as e:
+            errors.append(e)
+        finally:
+            frame_queue.put(None)
+
+    thread = threading.Thread(target=producer, daemon=True)
+    thread.start()
+    try:
+        while (frame := frame_queue.get()) is not None:
+            yield frame
+    finally:
+        stop.set()
+        # Drain so a producer blocked on a full queue can exit
+        while thread.is_alive():
+            try:
+                frame_queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        thread.join()
+    if errors:
+        raise errors[0]
+
+
+def _skip_duplicates(frames, max_distance=2):
+    # Static shots repeat the same picture; a 64-bit dHash finds them so the
+    # previous detection can be reused. Repeats are yielded as None.
+    last_hash = None
+    for frame in frames:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+        frame_hash = int.from_bytes(np.packbits(small[:, 1:] > small[:, :-1]).tobytes(), 'big')
+        if last_hash is not None and bin(frame_hash ^ last_hash).count('1') <= max_distance:
+            yield None
+            continue
+        last_hash = frame_hash
+        yield frame
+
+
+def _batched(frames, batch_size):
+    it = iter(frames)
+    while batch := list(islice(it, batch_size)):
+        yield batch
+
+
+def _detect_batch(classifier, frames):
+    # Older NudeNet releases only expose the single image detect()
+    if hasattr(classifier, 'detect_batch'):
+        return classifier.detect_batch(frames, batch_size=len(frames))
+    return [classifier.detect(frame) for frame in frames]
+
+
+def classify_video(video_path, classifier, threshold=0.5, num_frames=100, seek_mode=False, batch_size=16, model_resolution=None, dedupe_distance=2):
+    cap = _open_capture(video_path)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    # Bail out on the container header before any decode work starts
+    if not cap.isOpened() or total_frames <= 0 or fps <= 0:
+        cap.release()
+        raise ValueError(f"Unreadable video: {os.path.basename(video_path)}")
+    counts = np.zeros(len(allowed_labels), dtype=np.int64)
+    print(f"Processing video: {os.path.basename(video_path)}")
+    if seek_mode:
+        frames = _seek_frames(cap, total_frames / fps, num_frames)
+    else:
+        frames = _grab_frames(cap, total_frames, num_frames)
+    if model_resolution is None:
+        # Shrink to what the detector was built for, it upscales anything smaller
+        model_resolution = getattr(classifier, 'input_width', 320)
+    frames = _prefetch(_downscale(frames, model_resolution))
+    # Bind loop invariants to locals ahead of the per-detection loop
+    index = label_index
+    minlength = len(index)
+    frame_hits = []
+    sampled = 0
+    try:
+        for batch in _batched(_skip_duplicates(frames, dedupe_distance), batch_size):
+            sampled += len(batch)
+            # NudeDetector accepts decoded BGR arrays, no need for a temp JPEG
+            unique = [frame for frame in batch if frame is not None]
+            results = iter(_detect_batch(classifier, unique) if unique else ())
+            hits = []
+            for frame in batch:
+                # Near-duplicate frames count the previous frame's detections
+                if frame is not None:
+                    frame_hits = [
+                        index[d['class']]
+                        for d in next(results)
+                        if d['score'] > threshold and d['class'] in index
+                    ]
+                hits.extend(frame_hits)
+            # Aggregate classifications, one bincount per batch
+            if hits:
+                counts += np.bincount(hits, minlength=minlength)
+    finally:
+        # The decode thread must be stopped before the capture is released
+        frames.close()
+        cap.release()
+    if not sampled:
+        return {}
+    # Short clips yield fewer frames than num_frames, so divide by what was read
+    percentages = counts / sampled * 100
+    return {
+        label: float(percentages[i])
+        for label, i in index.items()
+        if counts[i]
+    }
+
+def compile_rules(rules):
+    # One row per rule, one column per label; -inf marks labels a rule ignores
+    thresholds = np.full((len(rules), len(allowed_labels)), -np.inf)
+    for row, rule in enumerate(rules):
+        for label, threshold in rule['thresholds'].items():
+            if label not in label_index:
+                # The classifier never reports this label, so the rule can't match
+                thresholds[row] = np.inf
+                break
+            thresholds[row, label_index[label]] = threshold
+    return thresholds
+
+
+def get_matching_rule(classifications, thresholds):
+    # Index of the first rule whose thresholds all pass, or None
+    percentages = np.full(len(allowed_labels), -np.inf)
+    for label, value in classifications.items():
+        percentages[label_index[label]] = value
+    matches = np.all(percentages >= thresholds, axis=1)
+    return int(matches.argmax()) if matches.any() else None
+
+def _classify_file(video_path, classifier, num_frames):
+    try:
+        return classify_video(video_path, classifier, num_frames=num_frames)
+    except Exception as e:
+        print(f"Unable to process {os.path.basename(video_path)} E:{e}")
+        return None
+
+
+def _classify_in_worker(video_path, num_frames):
+    # Pool processes can't share the parent's ONNX session, each caches its own
+    return _classify_file(video_path, get_detector(), num_frames)
+
+
+def _classify_files(video_directory, files, classifier, num_frames, workers):
+    if workers <= 1:
+        for filename in files:
+            video_path = os.path.join(video_directory, filename)
+            yield filename, _classify_file(video_path, classifier, num_frames)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(_classify_in_worker, os.path.join(video_directory, filename), num_frames): filename
+            for filename in files
+        }
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def _move_video(video_path, rule_dir, filename):
+    destination = os.path.join(rule_dir, filename)
+    # Rename when source and rule directory share a filesystem, copy otherwise
+    try:
+        os.replace(video_path, destination)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.move(video_path, destination)
+
+
+def sort_videos_by_rules(video_directory, output_directory, classifier, rules, num_frames=100, workers=1):
     # Create output directory if it doesn't exist
     os.makedirs(output_directory, exist_ok=True)
-    files = os.listdir(video_directory)
-    for i, filename in enumerate(files):
-        print(f"Processing {i} of {len(files)}")
-        if filename.endswith(('.mp4', '.avi', '.mov')):  # Add more video formats if needed
+    # Create every rule directory up front instead of once per moved video
+    for dir_name in {rule['dir_name'] for rule in rules} | {'unsorted'}:
+        os.makedirs(os.path.join(output_directory, dir_name), exist_ok=True)
+    # scandir reuses the entry type from the directory listing, no stat per file
+    with os.scandir(video_directory) as entries:
+        files = [e.name for e in entries if e.is_file() and e.name.endswith(video_extensions)]
+    # Videos are classified in parallel when workers > 1, moves stay in this process
+    results = _classify_files(video_directory, files, classifier, num_frames, workers)
+    thresholds = compile_rules(rules)
+    moves = []
+    # Moves run in the background so slow or network disks don't stall decoding
+    with ThreadPoolExecutor(max_workers=2) as io_pool:
+        for i, (filename, classifications) in enumerate(results):
+            print(f"Processing {i} of {len(files)}")
+            if classifications is None:
+                continue
             video_path = os.path.join(video_directory, filename)
-            # Classify the video
-            try:
-                classifications = classify_video(video_path, classifier, num_frames=num_frames)
-            except BaseException as e:
-                print(f"Unable to process {filename} E:{e}")
             print(classifications)
             # Check if the video matches any rule
-            for rule in rules:
-                if matches_rule(classifications, rule):
-                    # Create rule directory if it doesn't exist
-                    rule_dir = os.path.join(output_directory, rule['dir_name'])
-                    os.makedirs(rule_dir, exist_ok=True)
-                    # Move the video to the rule directory
-                    shutil.move(video_path, os.path.join(rule_dir, filename))
-                    print(f"Moved {filename} to {rule['dir_name']}")
-                    break
+            match = get_matching_rule(classifications, thresholds)
+            if match is not None:
+                dir_name = rules[match]['dir_name']
+                print(f"Moving {filename} to {dir_name}")
             else:
-                rule_dir = os.path.join(output_directory, 'unsorted')
-                os.makedirs(rule_dir, exist_ok=True)
-                shutil.move(video_path, os.path.join(rule_dir, filename))
+                dir_name = 'unsorted'
                 print(f"No matching rule for {filename}")
+            rule_dir = os.path.join(output_directory, dir_name)
+            moves.append((filename, io_pool.submit(_move_video, video_path, rule_dir, filename)))
+    for filename, future in moves:
+        try:
+            future.result()
+        except Exception as e:
+            print(f"Unable to move {filename} E:{e}")
 
 rules = [
     {
@@ -109,10 +371,13 @@ rules = [
 
 video_directory = '/Volumes/SharedFolder/media//vertical'
 output_directory = '/Volumes/SharedFolder/media//vertical/classified'
+# Keep at 1 when the detector runs on a GPU; raise on CPU-only hosts
+num_workers = 1
 
 def main():
-    detector = NudeDetector()
-    sort_videos_by_rules(video_directory, output_directory, detector, rules)
+    # Pool workers load their own detector
+    detector = get_detector() if num_workers <= 1 else None
+    sort_videos_by_rules(video_directory, output_directory, detector, rules, workers=num_workers)
 
 if __name__ == '__main__':
     main()
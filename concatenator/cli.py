@@ -1,7 +1,6 @@
 import argparse
 import sys
 import os
-import glob
 from tqdm import tqdm
 from tabulate import tabulate
 
@@ -10,7 +9,7 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(current_dir)
 sys.path.insert(0, parent_dir)
 
-from concatenator.utils import cleanup_temp_directory, sort_videos_by_orientation, sort_videos_by_bitrate, split_files_into_folders, get_video_info, format_duration, format_size, format_bitrate
+from concatenator.utils import cleanup_temp_directory, sort_videos_by_orientation, sort_videos_by_bitrate, split_files_into_folders, get_video_files, get_video_info, format_duration, format_size, format_bitrate
 from concatenator.core import VideoConcatenator
 
 def main():
@@ -94,10 +93,13 @@ def main():
         return
 
     # Get list of video files in the input directory
-    extensions = args.extensions.split(",")
-    input_files = []
-    for ext in extensions:
-        input_files.extend(glob.glob(os.path.join(args.input_directory, f"*.{ext}")))
+    extensions = frozenset(f".{ext.lower()}" for ext in args.extensions.split(","))
+    # One directory pass for all extensions; hidden files stay excluded like glob did
+    input_files = [
+        os.path.join(args.input_directory, f)
+        for f in get_video_files(args.input_directory, extensions)
+        if not f.startswith(".")
+    ]
 
     if not input_files:
         print(
@@ -105,8 +107,6 @@ def main():
         )
         return
 
-    input_files.sort()  # Sort files alphabetically
-
     print(f"Found {len(input_files)} video files to process.")
 
     try:
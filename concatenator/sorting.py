@@ -1,42 +1,46 @@
-for k, v in l.items():
-    print(f"Group name: {k}")
-    print(f"Number of videos for concatenation: {len(v)}")
-    groups = merge_small_groups_of_lists(group_by_bitrate(v))
-    print(f"Length of concatenanted video (Min) \n {[int(sum([g[1] for g in group])/60) for group in groups]}")
-    print(f"Bitrate diffenence in group \n {[int(max([y[0] for y in x]) - min(y[0] for y in x)) for x in groups]}")
-    print(" *"* 10)
+import numpy as np
+
+
+LENGTH_GROUPS = (
+    "shorter_than_60_sec",
+    "60_to_250_sec",
+    "250_to_750_sec",
+    "750_and_above_sec",
+)
+LENGTH_BOUNDARIES = (60, 250, 750)
 
 
 def group_by_length(elems):
-    # Define the groups
-    groups = {
-        "shorter_than_60_sec": [],
-        "60_to_250_sec": [],
-        "250_to_750_sec": [],
-        "750_and_above_sec": [],
+    elems = list(elems)
+    # Bin every length at once; bins[i] indexes into LENGTH_GROUPS
+    lengths = np.fromiter((length for _, length in elems), dtype=np.float64, count=len(elems))
+    bins = np.digitize(lengths, LENGTH_BOUNDARIES)
+    return {
+        name: [tuple(elems[i]) for i in np.flatnonzero(bins == group).tolist()]
+        for group, name in enumerate(LENGTH_GROUPS)
     }
-    # Iterate through each element
-    for bitrate, length in elems:
-        if length < 60:
-            groups["shorter_than_60_sec"].append((bitrate, length))
-        elif 60 <= length < 250:
-            groups["60_to_250_sec"].append((bitrate, length))
-        elif 250 <= length < 750:
-            groups["250_to_750_sec"].append((bitrate, length))
-        else:
-            groups["750_and_above_sec"].append((bitrate, length))
-    return groups
+
+
+# Below this size a plain sort is cheaper than the numpy round-trip
+PERCENTILE_SORT_THRESHOLD = 64
 
 
 def percentile(data, p):
     """Calculate the p-th percentile of a list of numbers."""
-    sorted_data = sorted(data)
-    k = (len(sorted_data) - 1) * p
+    k = (len(data) - 1) * p
     f = int(k)
     c = k - f
-    if f + 1 < len(sorted_data):
-        return sorted_data[f] * (1 - c) + sorted_data[f + 1] * c
-    return sorted_data[f]
+    if len(data) < PERCENTILE_SORT_THRESHOLD:
+        sorted_data = sorted(data)
+        if f + 1 < len(sorted_data):
+            return sorted_data[f] * (1 - c) + sorted_data[f + 1] * c
+        return sorted_data[f]
+    # Introselect only the ranks needed for interpolation, O(n)
+    arr = np.asarray(data)
+    if f + 1 < len(arr):
+        lower, upper = np.partition(arr, (f, f + 1))[[f, f + 1]]
+        return float(lower * (1 - c) + upper * c)
+    return float(np.partition(arr, f)[f])
 
 
 def group_by_bitrate(elems):
@@ -69,32 +73,43 @@ def merge_small_groups_of_lists(groups):
         return [group[i:i + target_size] for i in range(0, len(group), target_size)]
 
     target_size = calculate_target_size(groups)
+    # Loop invariant bounds, kept as floats to match the original comparisons
+    upper_limit = target_size * 1.5  # Allow some flexibility
+    lower_limit = target_size * 0.5
     merged_groups = []
-    current_group = []
 
+    def emit(group, group_len):
+        if group_len > upper_limit:
+            merged_groups.extend(split_large_group(group, target_size))
+        else:
+            merged_groups.append(group)
+
+    current_group = []
+    current_len = 0
     for group in groups:
-        if len(current_group) + len(group) <= target_size * 1.5:  # Allow some flexibility
+        group_len = len(group)
+        if current_len + group_len <= upper_limit:
             current_group.extend(group)
+            current_len += group_len
         else:
             if current_group:
-                if len(current_group) > target_size * 1.5:
-                    merged_groups.extend(split_large_group(current_group, target_size))
-                else:
-                    merged_groups.append(current_group)
-            current_group = group
+                emit(current_group, current_len)
+            # Copy so later extends never mutate the caller's lists
+            current_group = list(group)
+            current_len = group_len
 
     if current_group:
-        if len(current_group) > target_size * 1.5:
-            merged_groups.extend(split_large_group(current_group, target_size))
-        else:
-            merged_groups.append(current_group)
+        emit(current_group, current_len)
 
     # Final pass to merge any remaining small groups
     final_groups = []
+    last_len = 0
     for group in merged_groups:
-        if final_groups and len(final_groups[-1]) < target_size * 0.5:
+        if final_groups and last_len < lower_limit:
             final_groups[-1].extend(group)
+            last_len += len(group)
         else:
             final_groups.append(group)
+            last_len = len(group)
 
-    return final_groups
\ No newline at end of file
+    return final_groups
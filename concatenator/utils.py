@@ -1,3 +1,4 @@
+import errno
 import os
 from .ffmpeg_wrapper import FFmpegWrapper
 from .exceptions import FFmpegError
@@ -8,6 +9,31 @@ import math
 # Add these at the top of the file
 temp_dir = None
 
+VIDEO_EXTENSIONS = frozenset({'.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv'})
+
+
+def get_video_files(directory, extensions=VIDEO_EXTENSIONS):
+    # scandir hands back the dirent type, so is_file() needs no extra stat
+    video_files = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            # rpartition is one C call, the cheap suffix test goes first
+            stem, _, ext = entry.name.rpartition('.')
+            if stem and '.' + ext.lower() in extensions and entry.is_file():
+                video_files.append(entry.name)
+    video_files.sort()
+    return video_files
+
+
+def _fast_move(src, dst):
+    # A same-filesystem move is a single rename(2); only copy across devices
+    try:
+        os.replace(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.move(src, dst)
+
 
 def analyze_videos(input_files):
     ffmpeg = FFmpegWrapper()
@@ -187,8 +213,11 @@ def create_temp_directory():
 
 def cleanup_temp_directory():
     global temp_dir
-    if temp_dir and os.path.exists(temp_dir):
-        shutil.rmtree(temp_dir)
+    if temp_dir:
+        try:
+            shutil.rmtree(temp_dir)
+        except FileNotFoundError:
+            pass
     temp_dir = None
 
 
@@ -202,8 +231,7 @@ def sort_videos_by_orientation(input_directory):
     os.makedirs(vertical_dir, exist_ok=True)
 
     # Get all video files in the input directory
-    video_extensions = ('.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv')
-    video_files = [f for f in os.listdir(input_directory) if f.lower().endswith(video_extensions)]
+    video_files = get_video_files(input_directory)
 
     for video_file in video_files:
         input_path = os.path.join(input_directory, video_file)
@@ -222,7 +250,7 @@ def sort_videos_by_orientation(input_directory):
                 else:
                     destination = os.path.join(vertical_dir, video_file)
 
-                shutil.move(input_path, destination)
+                _fast_move(input_path, destination)
                 print(f"Moved {video_file} to {'horizontal' if width >= height else 'vertical'} folder")
             else:
                 print(f"Warning: No video stream found in {video_file}")
@@ -246,8 +274,7 @@ def sort_videos_by_bitrate(input_directory):
         os.makedirs(os.path.join(input_directory, bitrate), exist_ok=True)
 
     # Get all video files in the input directory
-    video_extensions = ('.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv')
-    video_files = [f for f in os.listdir(input_directory) if f.lower().endswith(video_extensions)]
+    video_files = get_video_files(input_directory)
 
     # First pass: calculate min and max bitrates
     min_bitrate = float('inf')
@@ -303,7 +330,7 @@ def sort_videos_by_bitrate(input_directory):
                 
                 # Move the file to the appropriate folder
                 destination = os.path.join(input_directory, bitrate_category, video_file)
-                shutil.move(input_path, destination)
+                _fast_move(input_path, destination)
                 print(f"Moved {video_file} to {bitrate_category} folder")
             else:
                 print(f"Warning: No video stream found in {video_file}")
@@ -317,8 +344,7 @@ def sort_videos_by_bitrate(input_directory):
 
 def split_files_into_folders(input_directory, files_per_folder=100):
     # Get all video files in the input directory
-    video_extensions = ('.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv')
-    video_files = [f for f in os.listdir(input_directory) if f.lower().endswith(video_extensions)]
+    video_files = get_video_files(input_directory)
     
     total_files = len(video_files)
     
@@ -338,7 +364,7 @@ def split_files_into_folders(input_directory, files_per_folder=100):
         destination_folder = os.path.join(input_directory, str(folder_number))
         destination_path = os.path.join(destination_folder, video_file)
         
-        shutil.move(source_path, destination_path)
+        _fast_move(source_path, destination_path)
         print(f"Moved {video_file} to folder {folder_number}")
     
     print(f"Split {total_files} files into {num_folders} folders.")
@@ -358,8 +384,7 @@ def get_video_info(input_directory):
     ffmpeg = FFmpegWrapper()
     
     # Get all video files in the input directory
-    video_extensions = ('.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv')
-    video_files = [f for f in os.listdir(input_directory) if f.lower().endswith(video_extensions)]
+    video_files = get_video_files(input_directory)
     
     total_duration = 0
     total_size = 0
@@ -427,14 +452,12 @@ def format_duration(seconds):
     seconds = int(seconds % 60)
     return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
 
+SIZE_UNITS = ('B', 'KB', 'MB', 'GB')
+
 def format_size(size_bytes):
-    # Convert bytes to MB or GB
-    if size_bytes < 1024 * 1024:
-        return f"{size_bytes / 1024:.2f} KB"
-    elif size_bytes < 1024 * 1024 * 1024:
-        return f"{size_bytes / (1024 * 1024):.2f} MB"
-    else:
-        return f"{size_bytes / (1024 * 1024 * 1024):.2f} GB"
+    # Pick the unit from the bit length: every 10 bits is one step of 1024
+    exponent = min(max((int(size_bytes).bit_length() - 1) // 10, 1), 3)
+    return f"{size_bytes / (1 << (exponent * 10)):.2f} {SIZE_UNITS[exponent]}"
 
 def format_bitrate(bitrate):
     if bitrate < 1000000:
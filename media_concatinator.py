@@ -57,11 +57,13 @@ def check_media_validity(filepath):
 
 
 def process_videos(input_folder, output_file, target_fps=30):
-    files = [
-        os.path.join(input_folder, f)
-        for f in os.listdir(input_folder)
-        if f.endswith(".mp4")
-    ]
+    # scandir yields ready-joined paths and skips directories without a stat
+    with os.scandir(input_folder) as entries:
+        files = [
+            entry.path
+            for entry in entries
+            if entry.name.endswith(".mp4") and entry.is_file()
+        ]
     if not files:
         print("No MP4 files found in the folder.")
         return